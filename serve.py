@@ -0,0 +1,17 @@
+import argparse
+
+from src.service.app import serve
+
+
+def main():
+    ap = argparse.ArgumentParser(description="SOP validation service (HTTP job queue with warm workers)")
+    ap.add_argument("--host", default="127.0.0.1", help="Bind address")
+    ap.add_argument("--port", type=int, default=8765, help="Port")
+    ap.add_argument("--workers", type=int, default=4, help="Worker threads running jobs")
+    ap.add_argument("--data-root", help="Only accept dataset paths inside this directory (relative paths resolve against it)")
+    args = ap.parse_args()
+    serve(host=args.host, port=args.port, workers=args.workers, data_root=args.data_root)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import os
 from dotenv import load_dotenv
 from langgraph.graph import START, StateGraph
 
+from src.validator.modes import RunMode
 from src.validator.runner import run_check
 from src.validator.router import route_check
 
@@ -12,7 +13,7 @@ class State(TypedDict, total=False):
     result: Dict[str, Any]
 
 
-def _llm_route(text: str):
+def _llm_route(text: str, datasets: Optional[Dict[str, Any]] = None):
     load_dotenv(override=True)
     # Map Azure-style envs if present (plug actual OpenAI client later)
     if os.getenv("LLMFOUNDRY_TOKEN") and not os.getenv("OPENAI_API_KEY"):
@@ -21,22 +22,24 @@ def _llm_route(text: str):
         os.environ["OPENAI_BASE_URL"] = os.getenv("base_url")  # type: ignore
     if os.getenv("AZURE_API_VERSION") and not os.getenv("OPENAI_API_VERSION"):
         os.environ["OPENAI_API_VERSION"] = os.getenv("AZURE_API_VERSION")  # type: ignore
-    return route_check(text)
+    return route_check(text, datasets)
 
 
-def build_graph(stock_df, master_df, gr_df):
+def build_graph(stock_df, master_df, gr_df, mode: Optional[RunMode] = None):
+    datasets = {"stock": stock_df, "master": master_df, "gr": gr_df}
+
     def route_node(state: State):
         check = state.get("check")
         if not check and "input" in state:  # langgraph may inject 'input' key
             state["check"] = state["input"]  # type: ignore
             check = state["check"]
-        intent = _llm_route(check)  # type: ignore
+        intent = _llm_route(check, datasets)  # type: ignore
         state["intent"] = intent  # type: ignore
         return state
 
     def act_node(state: State):
         check = state["check"]
-        result = run_check(check, stock_df=stock_df, master_df=master_df, gr_df=gr_df)
+        result = run_check(check, stock_df=stock_df, master_df=master_df, gr_df=gr_df, intent=state.get("intent"), mode=mode)
         state["result"] = result
         return state
 
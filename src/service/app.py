@@ -0,0 +1,375 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.graph.app import build_graph
+from src.validator.modes import MODES, RunMode
+from src.validator.router import intent_cache
+from src.validator.sop_loader import load_frame, load_sop
+
+_MAX_FINISHED_JOBS = 500
+
+
+class JobError(ValueError):
+    """Invalid job submission (reported to the client as HTTP 400)."""
+
+
+class DatasetCache:
+    """Loaded (dtype-compacted) frames kept resident, keyed by path, sheet and file mtime/size.
+
+    A file is re-read only when it changes on disk; concurrent requests for the same
+    file wait for a single load.
+    """
+
+    def __init__(self, max_entries: int = 16, on_evict: Optional[Callable[[List[Tuple[Any, ...]]], None]] = None):
+        self.max_entries = max_entries
+        # Called with the dropped keys so holders of those frames (compiled graphs) can release them
+        self.on_evict = on_evict
+        self._frames: "OrderedDict[Tuple[Any, ...], pd.DataFrame]" = OrderedDict()
+        self._loading: Dict[Tuple[Any, ...], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(path: str, sheet: Optional[str]) -> Tuple[Any, ...]:
+        st = os.stat(path)
+        return (path, sheet, st.st_mtime_ns, st.st_size)
+
+    def get(self, path: str, sheet: Optional[str] = None) -> Tuple[pd.DataFrame, Tuple[Any, ...]]:
+        key = self.key(path, sheet)
+        with self._lock:
+            if key in self._frames:
+                self.hits += 1
+                self._frames.move_to_end(key)
+                return self._frames[key], key
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        evicted: List[Tuple[Any, ...]] = []
+        with load_lock:
+            try:
+                with self._lock:
+                    if key in self._frames:
+                        self.hits += 1
+                        return self._frames[key], key
+                df = load_frame(path, sheet_name=sheet)
+                with self._lock:
+                    self.misses += 1
+                    # Older versions of the same file (different mtime/size) are stale
+                    evicted = [k for k in self._frames if k[:2] == key[:2]]
+                    for k in evicted:
+                        del self._frames[k]
+                    self._frames[key] = df
+                    while len(self._frames) > self.max_entries:
+                        evicted.append(self._frames.popitem(last=False)[0])
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        if evicted and self.on_evict:
+            self.on_evict(evicted)
+        return df, key
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __contains__(self, key: Tuple[Any, ...]) -> bool:
+        with self._lock:
+            return key in self._frames
+
+
+@dataclass
+class Job:
+    id: str
+    spec: Dict[str, Any]
+    mode: RunMode
+    status: str = "queued"  # queued | running | done | failed
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    total: int = 0
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "mode": self.mode.name,
+            "checks_total": self.total,
+            "checks_done": len(self.results),
+            "passed": sum(1 for r in self.results if r.get("passed")),
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "queue_seconds": round((self.started or time.time()) - self.submitted, 3),
+            "run_seconds": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            "error": self.error,
+        }
+
+
+class ValidationService:
+    """Job queue plus a pool of warm worker threads.
+
+    Workers share one process, so loaded frames, compiled graphs, the router client
+    and the intent cache stay resident and are reused across jobs and users.
+    """
+
+    def __init__(self, workers: int = 4, data_root: Optional[str] = None, max_datasets: int = 16, max_graphs: int = 16):
+        self.data_root = os.path.abspath(data_root) if data_root else None
+        self.datasets = DatasetCache(max_datasets, on_evict=self._drop_graphs)
+        self.max_graphs = max_graphs
+        self._graphs: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._busy = 0
+        self.started = time.time()
+        self.checks_done = 0
+        self.check_seconds = 0.0
+        self.graph_hits = 0
+        self.graph_misses = 0
+        self._workers = [threading.Thread(target=self._work, name=f"validator-{i}", daemon=True) for i in range(workers)]
+        for t in self._workers:
+            t.start()
+
+    # -- submission -------------------------------------------------------
+
+    def _resolve(self, path: Optional[str], label: str, required: bool = False) -> Optional[str]:
+        if not path:
+            if required:
+                raise JobError(f"'{label}' is required")
+            return None
+        full = os.path.abspath(os.path.join(self.data_root, path) if self.data_root else path)
+        if self.data_root and os.path.commonpath([full, self.data_root]) != self.data_root:
+            raise JobError(f"'{label}' must be inside the data root")
+        if not os.path.isfile(full):
+            raise JobError(f"'{label}' file not found: {path}")
+        return full
+
+    def submit(self, body: Dict[str, Any]) -> Job:
+        spec = {
+            "sop": self._resolve(body.get("sop"), "sop", required=True),
+            "stock": self._resolve(body.get("stock"), "stock", required=True),
+            "master": self._resolve(body.get("master"), "master"),
+            "gr": self._resolve(body.get("gr"), "gr"),
+            "stock_sheet": body.get("stock_sheet"),
+            "master_sheet": body.get("master_sheet"),
+            "gr_sheet": body.get("gr_sheet"),
+        }
+        try:
+            mode = RunMode(
+                body.get("mode", "full"),
+                max_violations=int(body.get("max_violations", 1)),
+                chunk_size=int(body.get("chunk_size", 100_000)),
+                sample_size=int(body.get("sample_size", 10_000)),
+                strata=body.get("strata"),
+            )
+        except (TypeError, ValueError) as e:
+            raise JobError(str(e))
+        job = Job(id=uuid.uuid4().hex[:12], spec=spec, mode=mode)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim_jobs()
+        self._queue.put(job.id)
+        return job
+
+    def _trim_jobs(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job_id in finished[: max(0, len(finished) - _MAX_FINISHED_JOBS)]:
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    # -- execution --------------------------------------------------------
+
+    def _frame(self, path: Optional[str], sheet: Optional[str]) -> Tuple[Optional[pd.DataFrame], Optional[Tuple[Any, ...]]]:
+        if path is None:
+            return None, None
+        # Sheet names only apply to workbooks
+        return self.datasets.get(path, sheet if path.lower().endswith((".xlsx", ".xls")) else None)
+
+    def _graph(self, spec: Dict[str, Any], mode: RunMode):
+        stock_df, stock_key = self._frame(spec["stock"], spec["stock_sheet"])
+        master_df, master_key = self._frame(spec["master"], spec["master_sheet"])
+        gr_df, gr_key = self._frame(spec["gr"], spec["gr_sheet"])
+        key = (stock_key, master_key, gr_key, tuple(sorted(vars(mode).items())))
+        with self._lock:
+            wf = self._graphs.get(key)
+            if wf is not None:
+                self.graph_hits += 1
+                self._graphs.move_to_end(key)
+                return wf
+        wf = build_graph(stock_df, master_df, gr_df, mode=mode)
+        with self._lock:
+            self.graph_misses += 1
+        # Skip caching if a frame was evicted meanwhile; nothing would ever drop this graph
+        if not all(k is None or k in self.datasets for k in key[:3]):
+            return wf
+        with self._lock:
+            self._graphs[key] = wf
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+        return wf
+
+    def _drop_graphs(self, dataset_keys: List[Tuple[Any, ...]]) -> None:
+        # Compiled graphs hold their frames; drop them with the frames so memory stays bounded
+        dropped = set(dataset_keys)
+        with self._lock:
+            for key in [k for k in self._graphs if dropped.intersection(k[:3])]:
+                del self._graphs[key]
+
+    def _run(self, job: Job) -> None:
+        sop_df = load_sop(job.spec["sop"])
+        job.total = len(sop_df)
+        wf = self._graph(job.spec, job.mode)
+        for _, row in sop_df.iterrows():
+            started = time.perf_counter()
+            out = wf.invoke({"check": str(row["checks"])})
+            res = out.get("result", {})
+            # propagate id/severity if present
+            for extra in ("id", "severity"):
+                if extra in sop_df.columns:
+                    res[extra] = row.get(extra)
+            job.results.append(res)
+            with self._lock:
+                self.checks_done += 1
+                self.check_seconds += time.perf_counter() - started
+
+    def _work(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            job = self.get(job_id)
+            if job is None:
+                continue
+            with self._lock:
+                self._busy += 1
+            job.status, job.started = "running", time.time()
+            try:
+                self._run(job)
+                job.status = "done"
+            except Exception as e:
+                job.status, job.error = "failed", str(e)
+            finally:
+                job.finished = time.time()
+                with self._lock:
+                    self._busy -= 1
+
+    def shutdown(self) -> None:
+        for _ in self._workers:
+            self._queue.put(None)
+
+    # -- metrics ----------------------------------------------------------
+
+    def metrics(self) -> Dict[str, Any]:
+        jobs = self.jobs()
+        by_status: Dict[str, int] = {}
+        for job in jobs:
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        finished = [j for j in jobs if j.finished and j.started]
+        uptime = time.time() - self.started
+        return {
+            "uptime_seconds": round(uptime, 1),
+            "workers": len(self._workers),
+            "workers_busy": self._busy,
+            "queue_depth": self._queue.qsize(),
+            "jobs": by_status,
+            "checks_done": self.checks_done,
+            "checks_per_second": round(self.checks_done / uptime, 3) if uptime else 0.0,
+            "avg_check_seconds": round(self.check_seconds / self.checks_done, 3) if self.checks_done else None,
+            "avg_job_seconds": round(sum(j.finished - j.started for j in finished) / len(finished), 3) if finished else None,
+            "avg_queue_seconds": round(sum(j.started - j.submitted for j in finished) / len(finished), 3) if finished else None,
+            "datasets_cached": len(self.datasets),
+            "dataset_cache_hits": self.datasets.hits,
+            "dataset_cache_misses": self.datasets.misses,
+            "graphs_cached": len(self._graphs),
+            "graph_cache_hits": self.graph_hits,
+            "graph_cache_misses": self.graph_misses,
+            "intent_cache_size": len(intent_cache()),
+        }
+
+
+def _json_default(value: Any) -> Any:
+    # numpy scalars and Timestamps in tool examples
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def make_handler(service: ValidationService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload, default=_json_default).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+            if parts == ["health"]:
+                return self._send(200, {"status": "ok"})
+            if parts == ["metrics"]:
+                return self._send(200, service.metrics())
+            if parts == ["jobs"]:
+                return self._send(200, [j.summary() for j in service.jobs()])
+            if len(parts) in (2, 3) and parts[0] == "jobs":
+                job = service.get(parts[1])
+                if job is None:
+                    return self._send(404, {"error": "unknown job"})
+                if len(parts) == 2:
+                    return self._send(200, job.summary())
+                if parts[2] == "results":
+                    # Partial results are returned while the job is still running
+                    return self._send(200, {**job.summary(), "results": list(job.results)})
+            return self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path.split("?")[0].rstrip("/") != "/jobs":
+                return self._send(404, {"error": "not found"})
+            try:
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    raise JobError("invalid Content-Length header")
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(body, dict):
+                    raise JobError("request body must be a JSON object")
+                job = service.submit(body)
+            except (JobError, json.JSONDecodeError) as e:
+                return self._send(400, {"error": str(e), "modes": list(MODES)})
+            return self._send(202, job.summary())
+
+        def log_message(self, fmt, *args):  # keep the console for job output
+            pass
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, workers: int = 4, data_root: Optional[str] = None) -> None:
+    service = ValidationService(workers=workers, data_root=data_root)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"SOP validation service on http://{host}:{port} ({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+        server.server_close()
@@ -0,0 +1,147 @@
+import re
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+# Share of non-null values that must parse before a text column is converted
+_PARSE_RATIO = 0.95
+# Text columns with at most this share of distinct values become categoricals
+_CATEGORY_RATIO = 0.5
+_LEADING_ZERO = re.compile(r"^0\d")
+_DATE_LIKE = re.compile(r"^\s*\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}")
+_SAMPLE_ROWS = 200
+# Key/identifier columns are never parsed as numbers (leading zeros and exact text matter)
+_IDENTIFIER_NAME = re.compile(r"material|batch|document|\bdoc\b|code|\blot\b|serial|\bid\b|\bno\b|number", re.IGNORECASE)
+
+
+class SourceText(dict):
+    """Original text of parsed columns, kept in `df.attrs["source_text"]`.
+
+    pandas deep-copies and compares `attrs` on most operations; sharing the same
+    instance (and comparing by identity) keeps that cheap and safe.
+    """
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __eq__(self, other):
+        return self is other
+
+    __hash__ = object.__hash__
+
+
+def _is_text(ser: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(ser) or pd.api.types.is_string_dtype(ser)
+
+
+def _to_number(text: pd.Series) -> pd.Series:
+    cleaned = text.str.replace(",", "", regex=False).str.replace(" ", "", regex=False)
+    return pd.to_numeric(cleaned.astype(object), errors="coerce").astype("float64")
+
+
+def _parses(parsed: pd.Series, text: pd.Series) -> bool:
+    return parsed.notna().sum() >= _PARSE_RATIO * text.notna().sum()
+
+
+def is_identifier(column: Any) -> bool:
+    return bool(_IDENTIFIER_NAME.search(str(column)))
+
+
+def _parse_numeric(text: pd.Series) -> Optional[pd.Series]:
+    # Reject on a sample first so ordinary text columns cost no full-column parse
+    sample = text.head(_SAMPLE_ROWS)
+    if not _parses(_to_number(sample), sample):
+        return None
+    # Identifiers like "000123" or long document numbers stay text; checked on every row
+    if text.str.match(_LEADING_ZERO).any() or (text.str.len() > 15).any():
+        return None
+    parsed = _to_number(text)
+    return _as_wide_number(parsed) if _parses(parsed, text) else None
+
+
+def _parse_dates(text: pd.Series) -> Optional[pd.Series]:
+    if not text.head(_SAMPLE_ROWS).dropna().str.match(_DATE_LIKE).all():
+        return None
+    try:
+        parsed = pd.to_datetime(text.astype(object), errors="coerce", format="mixed")
+    except (TypeError, ValueError):
+        parsed = pd.to_datetime(text.astype(object), errors="coerce")
+    return parsed if _parses(parsed, text) else None
+
+
+def _as_wide_number(ser: pd.Series) -> pd.Series:
+    # Kept at 64 bits: row_condition does arithmetic on these columns and narrow ints wrap
+    # (int8 100 * 2 == -56). Memory savings come from categoricals and datetimes instead.
+    if ser.notna().all() and ser.mod(1).eq(0).all():
+        return ser.astype("int64")
+    return ser.astype("float64")
+
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    total = int(df.memory_usage(deep=True).sum())
+    for text in (df.attrs.get("source_text") or {}).values():
+        total += int(text.memory_usage(deep=True))
+    return total
+
+
+def compact_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Infer compact dtypes once at load time.
+
+    Numeric text ("45,000") and dates are parsed into int64/float64 / datetime
+    columns, low-cardinality text becomes categorical. The original text of parsed
+    columns is kept (as categoricals) in `df.attrs["source_text"]` for examples.
+    Returns the new frame and a report with memory before/after and conversions.
+    """
+    before = memory_bytes(df)
+    out: Dict[Any, pd.Series] = {}
+    source = SourceText()
+    converted: Dict[str, str] = {}
+    n = len(df)
+    for col in df.columns:
+        ser = df[col]
+        if not _is_text(ser):
+            out[col] = ser
+            continue
+        text = ser.astype("string").str.strip()
+        parsed = _parse_numeric(text) if n and not is_identifier(col) else None
+        if parsed is None and n:
+            parsed = _parse_dates(text)
+        if parsed is not None:
+            out[col] = parsed
+            source[col] = ser.astype("category")
+            converted[str(col)] = str(parsed.dtype)
+        elif n and ser.nunique(dropna=True) <= max(1, _CATEGORY_RATIO * n):
+            out[col] = ser.astype("category")
+            converted[str(col)] = "category"
+        else:
+            out[col] = ser
+    compacted = pd.DataFrame(out, index=df.index)
+    compacted.attrs = dict(df.attrs)
+    if source:
+        compacted.attrs["source_text"] = source
+    after = memory_bytes(compacted)
+    report = {"memory_before": before, "memory_after": after, "converted": converted}
+    compacted.attrs["compaction"] = report
+    return compacted, report
+
+
+def source_text(df: pd.DataFrame, column: str) -> Optional[pd.Series]:
+    """Original text of a parsed column, or None if the column was not converted."""
+    return (df.attrs.get("source_text") or {}).get(column)
+
+
+def format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024  # type: ignore
+    return f"{n} B"
+
+
+def memory_summary(df: pd.DataFrame) -> Optional[str]:
+    report = df.attrs.get("compaction")
+    if not report:
+        return None
+    before, after = report["memory_before"], report["memory_after"]
+    ratio = before / after if after else 0
+    return f"{format_bytes(before)} -> {format_bytes(after)} ({ratio:.1f}x)"
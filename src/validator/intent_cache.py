@@ -0,0 +1,160 @@
+import copy
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Filler words that carry no intent; dropping them keeps paraphrases close
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "be", "been", "must", "should", "shall", "ensure", "check",
+    "verify", "confirm", "that", "in", "of", "for", "and", "to", "with", "column", "field",
+}
+_TOKEN = re.compile(r"[0-9a-z]+")
+_QUOTED = re.compile(r"['\"`]([^'\"`]+)['\"`]")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+_COMPARATOR = re.compile(r"[<>]")
+
+# Words that flip or change a check's meaning, mapped to one canonical anchor so
+# paraphrases ("below"/"less than") still agree while opposites ("less"/"greater") never do.
+# "exists" is deliberately absent: "no duplicate receipt exists" and "no duplicate GR" mean the same.
+_POLARITY = {
+    **dict.fromkeys(("less", "below", "under", "lower", "smaller", "<"), "lt"),
+    **dict.fromkeys(("greater", "above", "over", "higher", "more", "exceed", "exceeds", ">"), "gt"),
+    **dict.fromkeys(("min", "minimum", "least"), "min"),
+    **dict.fromkeys(("max", "maximum", "most"), "max"),
+    **dict.fromkeys(("not", "no", "never", "non"), "not"),
+    **dict.fromkeys(("empty", "blank", "null", "missing"), "empty"),
+    **dict.fromkeys(("future",), "future"),
+    **dict.fromkeys(("past",), "past"),
+    **dict.fromkeys(("match", "matches", "matching", "equal", "equals", "same"), "match"),
+}
+
+# Words that decide the tool or target dataset. Column names dominate the trigram overlap,
+# so without these "Material Code must be unique" scores close to "Material Code must be in master".
+_TOOL_WORDS = {
+    **dict.fromkeys(("unique", "uniqueness", "duplicate", "duplicates", "duplicated", "repeated"), "dup"),
+    **dict.fromkeys(("master",), "master"),
+    **dict.fromkeys(("gr", "grn", "receipt", "receipts", "mb51"), "gr"),
+    **dict.fromkeys(("pattern", "format", "formatted", "regex"), "pattern"),
+    **dict.fromkeys(("range", "between"), "range"),
+}
+_ANCHOR_WORDS = {**_POLARITY, **_TOOL_WORDS}
+
+DEFAULT_THRESHOLD = 0.75
+
+
+def _tokens(text: str) -> List[str]:
+    return [w for w in _TOKEN.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _features(text: str) -> Counter:
+    # Word stems (5-char prefix) plus character trigrams inside each word
+    feats: Counter = Counter()
+    for word in _tokens(text):
+        word = _ANCHOR_WORDS.get(word, word)
+        feats["w:" + word[:5]] += 1
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            feats[padded[i:i + 3]] += 1
+    return feats
+
+
+def _anchors(text: str) -> Tuple[str, ...]:
+    """Quoted names, numbers, polarity and tool words; a cached intent is only reused when these agree exactly."""
+    quoted = {q.strip().lower() for q in _QUOTED.findall(text)}
+    numbers = set(_NUMBER.findall(text))
+    words = _TOKEN.findall(text.lower()) + _COMPARATOR.findall(text)
+    meaning = {"~" + _ANCHOR_WORDS[w] for w in words if w in _ANCHOR_WORDS}
+    return tuple(sorted(quoted | numbers | meaning))
+
+
+class IntentCache:
+    """Local TF-IDF nearest-neighbour index over previously routed check texts.
+
+    No external service: vectors are character trigrams + word stems weighted by
+    smoothed IDF over the stored texts, compared with cosine similarity.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, path: Optional[str] = None):
+        self.threshold = threshold
+        self.path = path
+        self._texts: List[str] = []
+        self._intents: List[Dict[str, Any]] = []
+        self._feats: List[Counter] = []
+        self._df: Counter = Counter()
+        self._vectors: Optional[List[Dict[str, float]]] = None
+        self._lock = threading.RLock()
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _idf(self, gram: str) -> float:
+        n = len(self._texts)
+        return math.log((1 + n) / (1 + self._df.get(gram, 0))) + 1
+
+    def _vector(self, feats: Counter) -> Dict[str, float]:
+        vec = {g: (1 + math.log(c)) * self._idf(g) for g, c in feats.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {g: v / norm for g, v in vec.items()}
+
+    def lookup(self, text: str) -> Optional[Tuple[Dict[str, Any], float, str]]:
+        """Return (intent copy, score, matched text) for the nearest stored check above threshold."""
+        with self._lock:
+            if not self._texts:
+                return None
+            if self._vectors is None:
+                # IDF shifts as texts are added; rebuild lazily on the next lookup
+                self._vectors = [self._vector(f) for f in self._feats]
+            query = self._vector(_features(text))
+            anchors = _anchors(text)
+            best, best_score = -1, 0.0
+            for i, vec in enumerate(self._vectors):
+                if _anchors(self._texts[i]) != anchors:
+                    continue
+                score = sum(w * vec.get(g, 0.0) for g, w in query.items())
+                if score > best_score:
+                    best, best_score = i, score
+            if best < 0 or best_score < self.threshold:
+                return None
+            return copy.deepcopy(self._intents[best]), round(min(best_score, 1.0), 4), self._texts[best]
+
+    def add(self, text: str, intent: Dict[str, Any]) -> None:
+        with self._lock:
+            if text in self._texts:
+                self._intents[self._texts.index(text)] = copy.deepcopy(intent)
+            else:
+                feats = _features(text)
+                self._texts.append(text)
+                self._intents.append(copy.deepcopy(intent))
+                self._feats.append(feats)
+                self._df.update(feats.keys())
+                self._vectors = None
+            if self.path:
+                self._save(self.path)
+
+    def _load(self, path: str) -> None:
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                entries = json.load(fh)
+        except Exception:
+            return
+        for entry in entries:
+            if isinstance(entry, dict) and "text" in entry and "intent" in entry:
+                feats = _features(entry["text"])
+                self._texts.append(entry["text"])
+                self._intents.append(entry["intent"])
+                self._feats.append(feats)
+                self._df.update(feats.keys())
+
+    def _save(self, path: str) -> None:
+        entries = [{"text": t, "intent": i} for t, i in zip(self._texts, self._intents)]
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(entries, fh, ensure_ascii=False, indent=1, default=str)
+        os.replace(tmp, path)
@@ -0,0 +1,191 @@
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .tools import ToolResult, _examples
+
+MODES = ("full", "fail-fast", "sample")
+
+# Info keys under which each tool reports its violation count
+_COUNT_KEYS = ("duplicate_count", "missing_count", "failing_count", "future_count", "mismatch_count")
+
+# Tools whose verdict for a row depends only on that row (plus master data)
+_ROW_LOCAL = {"value_in_master", "row_condition", "date_not_future", "value_range", "regex_match", "match_master_on_keys"}
+
+
+@dataclass
+class RunMode:
+    """Per-run validation mode.
+
+    full: every row, exact counts. fail-fast: scan in chunks and stop once
+    `max_violations` are found. sample: run on a stratified random sample and
+    estimate the violation rate with a Wilson confidence interval.
+    """
+
+    name: str = "full"
+    max_violations: int = 1
+    chunk_size: int = 100_000
+    sample_size: int = 10_000
+    strata: Optional[str] = None
+    confidence: float = 0.95
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.name not in MODES:
+            raise ValueError(f"Unknown mode '{self.name}'; expected one of {', '.join(MODES)}")
+
+
+# Distinct source rows, where a tool's count can exceed them (merged rows from duplicate master keys)
+_ROW_COUNT_KEYS = {"mismatch_count": "mismatch_rows"}
+
+
+def _count(info: Dict[str, Any]) -> Tuple[Optional[str], int]:
+    for key in _COUNT_KEYS:
+        if key in info:
+            return key, int(info[key])
+    return None, 0
+
+
+def _wilson(k: int, n: int, confidence: float) -> Tuple[float, float]:
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    p = min(max(k / n, 0.0), 1.0)
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _chunks(df: pd.DataFrame, size: int):
+    for start in range(0, len(df), max(1, size)):
+        yield df.iloc[start:start + size]
+
+
+def _fail_fast(call: Callable[[pd.DataFrame], ToolResult], df: pd.DataFrame, mode: RunMode) -> ToolResult:
+    key, total, scanned = None, 0, 0
+    examples: List[Dict[str, Any]] = []
+    for part in _chunks(df, mode.chunk_size):
+        res = call(part)
+        if "error" in res.info:
+            return res
+        part_key, n = _count(res.info)
+        key = key or part_key
+        total += n
+        scanned += len(part)
+        examples.extend(res.info.get("examples", [])[: max(0, 5 - len(examples))])
+        if total >= mode.max_violations:
+            break
+    info = {key or "failing_count": total, "examples": examples, "rows_scanned": scanned, "rows_total": len(df), "stopped_early": scanned < len(df)}
+    return ToolResult(passed=total == 0, info=info)
+
+
+def _any_match_fail_fast(call: Callable[[pd.DataFrame], ToolResult], df: pd.DataFrame, mode: RunMode) -> ToolResult:
+    # regex_match(mode="any") is decided by the first matching chunk
+    scanned = 0
+    for part in _chunks(df, mode.chunk_size):
+        res = call(part)
+        scanned += len(part)
+        if res.passed or "error" in res.info:
+            break
+    else:
+        res = ToolResult(passed=False, info={"examples": []})
+    res.info.update({"rows_scanned": scanned, "rows_total": len(df), "stopped_early": scanned < len(df)})
+    return res
+
+
+def _duplicates_fail_fast(df: pd.DataFrame, columns: List[str], allowed: bool, mode: RunMode) -> ToolResult:
+    # One vectorised pass: a row's keep-first duplicate flag depends only on earlier rows, so
+    # the row holding the N-th repeat is exactly where a streaming scan would have stopped.
+    repeats = np.flatnonzero(df.duplicated(subset=columns, keep="first").to_numpy())
+    stop = int(repeats[mode.max_violations - 1]) + 1 if len(repeats) >= mode.max_violations else len(df)
+    scanned = df.iloc[:stop]
+    # Same counting as duplicates_check over the scanned rows (all occurrences)
+    dup = scanned.duplicated(subset=columns, keep=False)
+    count = int(dup.sum())
+    examples = _examples(scanned.loc[dup]) if count else []
+    info = {"duplicate_count": count, "examples": examples, "rows_scanned": stop, "rows_total": len(df), "stopped_early": stop < len(df)}
+    return ToolResult(passed=allowed or count == 0, info=info)
+
+
+def _pick_strata(df: pd.DataFrame, strata: Optional[str]) -> Optional[str]:
+    if strata:
+        return strata if strata in df.columns else None
+    # Default to the first low-cardinality categorical (Plant, Storage Location, ...)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and 1 < len(df[col].cat.categories) <= 50:
+            return col
+    return None
+
+
+def _sample(df: pd.DataFrame, mode: RunMode) -> Tuple[pd.DataFrame, Optional[str]]:
+    # Proportional allocation keeps the sample self-weighting, so the pooled rate is the estimate
+    frac = mode.sample_size / len(df)
+    strata = _pick_strata(df, mode.strata)
+    if strata is None:
+        return df.sample(frac=frac, random_state=mode.seed), None
+    # groupby drops NaN keys, so rows with a blank stratum (e.g. no Plant) are sampled as their own stratum
+    blank = df[strata].isna()
+    sample = df[~blank].groupby(strata, observed=True, group_keys=False).sample(frac=frac, random_state=mode.seed)
+    if blank.any():
+        sample = pd.concat([sample, df[blank].sample(frac=frac, random_state=mode.seed)])
+    return sample, strata
+
+
+def _sampled(call: Callable[[pd.DataFrame], ToolResult], df: pd.DataFrame, mode: RunMode) -> ToolResult:
+    sample, strata = _sample(df, mode)
+    res = call(sample)
+    if "error" in res.info:
+        return res
+    key, k = _count(res.info)
+    # The interval is over sampled rows, so count violating rows rather than e.g. merged rows
+    k = int(res.info.get(_ROW_COUNT_KEYS.get(key, ""), k))
+    n = len(sample)
+    rate = k / n if n else 0.0
+    low, high = _wilson(k, n, mode.confidence)
+    info = dict(res.info)
+    info.update({
+        "sample_size": n,
+        "rows_total": len(df),
+        "strata": strata,
+        "estimated_violation_rate": round(rate, 6),
+        "ci_low": round(low, 6),
+        "ci_high": round(high, 6),
+        "confidence": mode.confidence,
+        "estimated_violations": round(rate * len(df)),
+    })
+    return ToolResult(passed=res.passed, info=info)
+
+
+def run_with_mode(
+    tool_name: str,
+    args: Dict[str, Any],
+    call: Callable[[pd.DataFrame], ToolResult],
+    df: pd.DataFrame,
+    mode: RunMode,
+) -> Tuple[ToolResult, str]:
+    """Run `call` on `df` (the tool's target frame) under `mode`.
+
+    Returns the result and the mode that actually produced it: tools that need
+    the whole dataset (duplicates, `regex_match` any) fall back to full in sample mode,
+    and small frames are always run in full.
+    """
+    if mode.name == "full" or tool_name == "column_exists" or len(df) == 0:
+        return call(df), "full"
+    if mode.name == "fail-fast":
+        if tool_name == "duplicates_check":
+            return _duplicates_fail_fast(df, args["columns"], args.get("allowed", False), mode), mode.name
+        if tool_name == "regex_match" and args.get("mode", "all") != "all":
+            return _any_match_fail_fast(call, df, mode), mode.name
+        if tool_name in _ROW_LOCAL:
+            return _fail_fast(call, df, mode), mode.name
+        return call(df), "full"
+    # sample
+    row_local = tool_name in _ROW_LOCAL and not (tool_name == "regex_match" and args.get("mode", "all") != "all")
+    if not row_local or len(df) <= mode.sample_size:
+        return call(df), "full"
+    return _sampled(call, df, mode), mode.name
@@ -1,8 +1,12 @@
 import json
 import os
 import re
-from typing import Any, Dict, Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+import pandas as pd
+
+from .intent_cache import DEFAULT_THRESHOLD, IntentCache
 
 try:
     from openai import AzureOpenAI
@@ -55,11 +59,196 @@ TOOLS = [
 SYSTEM_PROMPT = (
     "You are a precise SOP check intent router. Given one check line, choose exactly one tool and arguments. "
     "Return strict JSON only: {\"tool\": <name>, \"args\": {..}}. If ambiguous, infer the most likely intent. "
-    "Datasets available: stock, master, gr (Goods Receipt). Common columns: stock/master -> Material Code, Batch, Date of Manufacturing; gr -> Material Document. "
+    "Datasets available: stock, master, gr (Goods Receipt). Use only column names listed under Schemas, spelled exactly; never invent columns. "
     "When check mentions MB51/GR, use dataset 'gr'. For manufacturing date vs documentation, compare stock vs master on keys ['Material Code','Batch'] and column 'Date of Manufacturing'. "
 )
 
+# Fallback schema when the caller has no loaded frames to describe
+DEFAULT_SCHEMAS = "stock: Material Code, Batch, Date of Manufacturing\nmaster: Material Code, Batch, Date of Manufacturing\ngr: Material Document"
+
+# Argument names whose values are column names (single or list)
+_COLUMN_ARGS = ("column", "master_column", "columns", "keys")
+_SAMPLE_ROWS = 50
+_SAMPLE_VALUES = 3
+_SAMPLE_CHARS = 24
+
+
+def _compact_tool(tool: Dict[str, Any]) -> str:
+    props = tool["args"].get("properties", {})
+    required = set(tool["args"].get("required", []))
+    parts = []
+    for name, spec in props.items():
+        if "enum" in spec:
+            kind = "|".join(spec["enum"])
+        elif spec.get("type") == "array":
+            kind = "[" + spec.get("items", {}).get("type", "any")[:3] + "]"
+        else:
+            kind = {"string": "str", "number": "num", "boolean": "bool"}.get(spec.get("type"), "any")
+        parts.append(f"{name}{'' if name in required else '?'}:{kind}")
+    return f"{tool['name']}({','.join(parts)}) - {tool['description']}"
+
+
+# Static part of the system message; built once so it is byte-identical across calls
+# and provider-side prompt caching can reuse it.
+PROMPT_PREFIX = SYSTEM_PROMPT + "\nTools:\n" + "\n".join(_compact_tool(t) for t in TOOLS)
+
+
+def _compact_dtype(ser: pd.Series) -> str:
+    if isinstance(ser.dtype, pd.CategoricalDtype):
+        return "cat"
+    if pd.api.types.is_bool_dtype(ser):
+        return "bool"
+    if pd.api.types.is_integer_dtype(ser):
+        return "int"
+    if pd.api.types.is_float_dtype(ser):
+        return "num"
+    if pd.api.types.is_datetime64_any_dtype(ser):
+        return "date"
+    return "str"
+
+
+def _sample_values(ser: pd.Series) -> List[str]:
+    values = ser.head(_SAMPLE_ROWS).dropna().astype(str).unique()[:_SAMPLE_VALUES]
+    return [v[:_SAMPLE_CHARS] for v in values]
+
+
+def describe_frame(name: str, df: pd.DataFrame) -> str:
+    """One line per dataset: `name: Col:dtype=v1|v2|v3; ...`."""
+    cols = []
+    for col in df.columns:
+        samples = "|".join(_sample_values(df[col]))
+        cols.append(f"{col}:{_compact_dtype(df[col])}" + (f"={samples}" if samples else ""))
+    return f"{name}: " + "; ".join(cols)
+
+
+_schema_memo: Dict[Tuple[Any, ...], str] = {}
+_SCHEMA_MEMO_SIZE = 16  # a few concurrent runs (service workers) each keep their own entry
+_lock = threading.Lock()  # guards shared module state (schema memo, intent cache, clients) across threads
+
+
+def _frame_key(name: str, df: pd.DataFrame) -> Tuple[Any, ...]:
+    # Cheap content fingerprint: only the head rows feed the sample values
+    head = pd.util.hash_pandas_object(df.head(_SAMPLE_ROWS), index=False).to_numpy().tobytes()
+    return name, tuple(df.columns), tuple(str(t) for t in df.dtypes), head
+
+
+def describe_datasets(datasets: Dict[str, Optional[pd.DataFrame]]) -> str:
+    """Render the loaded datasets as the compact Schemas block of the system prompt.
+
+    The result is memoised on what it is rendered from (columns, dtypes and the
+    sampled head rows), so every check of a run sends the same bytes and a reloaded
+    frame never picks up another frame's sample values.
+    """
+    frames = [(name, df) for name, df in datasets.items() if df is not None]
+    if not frames:
+        return DEFAULT_SCHEMAS
+    try:
+        key: Optional[Tuple[Any, ...]] = tuple(_frame_key(name, df) for name, df in frames)
+    except TypeError:
+        key = None  # unhashable cell values; render without memoising
+    with _lock:
+        text = _schema_memo.get(key) if key is not None else None
+    if text is None:
+        # Rendered outside the lock; a concurrent duplicate render is harmless
+        text = "\n".join(describe_frame(name, df) for name, df in frames)
+        if key is not None:
+            with _lock:
+                while len(_schema_memo) >= _SCHEMA_MEMO_SIZE:
+                    _schema_memo.pop(next(iter(_schema_memo)))
+                _schema_memo[key] = text
+    return text
+
+
+def _normalize_col(name: Any) -> str:
+    return re.sub(r"[\s_]+", " ", str(name)).strip().lower()
+
+
+def resolve_columns(intent: Dict[str, Any], datasets: Dict[str, Optional[pd.DataFrame]]) -> Dict[str, Any]:
+    """Snap column arguments to the real column names (case/spacing-insensitive).
+
+    Returns the intent unchanged when nothing matches, so the tool reports the missing column.
+    """
+    known: Dict[str, str] = {}
+    for df in datasets.values():
+        if df is not None:
+            for col in df.columns:
+                known.setdefault(_normalize_col(col), col)
+    args = intent.get("args")
+    if not known or not isinstance(args, dict):
+        return intent
+
+    def snap(value: Any) -> Any:
+        if isinstance(value, str):
+            return known.get(_normalize_col(value), value)
+        return value
+
+    for arg in _COLUMN_ARGS:
+        if isinstance(args.get(arg), list):
+            args[arg] = [snap(v) for v in args[arg]]
+        elif arg in args:
+            args[arg] = snap(args[arg])
+    return intent
+
+
+def _column_targets(intent: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Columns each dataset must provide for the intent, mirroring how the runner picks frames."""
+    tool = intent.get("tool")
+    args = intent.get("args") or {}
+
+    def listed(*names: str) -> List[Any]:
+        out: List[Any] = []
+        for name in names:
+            value = args.get(name)
+            out.extend(value if isinstance(value, list) else [value] if value is not None else [])
+        return out
+
+    if tool == "duplicates_check":
+        return {"gr" if args.get("dataset") == "gr" else "stock": listed("columns")}
+    if tool == "value_in_master":
+        return {"stock": listed("column"), "master": listed("master_column")}
+    if tool == "match_master_on_keys":
+        return {"stock": listed("keys", "column"), "master": listed("keys", "column")}
+    return {"stock": listed(*_COLUMN_ARGS)}
+
+
+def _fits_datasets(intent: Dict[str, Any], datasets: Dict[str, Optional[pd.DataFrame]]) -> bool:
+    # Checked per frame: a GR duplicates intent must not be served (and silently run on stock) without GR data
+    if all(df is None for df in datasets.values()):
+        return True
+    for name, columns in _column_targets(intent).items():
+        df = datasets.get(name)
+        if df is None or any(col not in df.columns for col in columns):
+            return False
+    return True
+
+
+_intent_cache: Optional[IntentCache] = None
+
+
+def intent_cache() -> IntentCache:
+    """Process-wide similarity cache; configure with ROUTER_CACHE_THRESHOLD / ROUTER_CACHE_PATH."""
+    global _intent_cache
+    with _lock:
+        if _intent_cache is not None:
+            return _intent_cache
+        load_dotenv(override=True)
+        try:
+            threshold = float(os.getenv("ROUTER_CACHE_THRESHOLD") or DEFAULT_THRESHOLD)
+        except ValueError:
+            threshold = DEFAULT_THRESHOLD
+        _intent_cache = IntentCache(threshold=threshold, path=os.getenv("ROUTER_CACHE_PATH") or None)
+    return _intent_cache
+
+
+def build_messages(text: str, schemas: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": PROMPT_PREFIX + "\nSchemas:\n" + schemas},
+        {"role": "user", "content": text},
+    ]
+
+
 _last_error: Optional[str] = None
+_clients: Dict[Tuple[str, str, str], Any] = {}
 
 
 def _client_from_env():
@@ -71,7 +260,12 @@ def _client_from_env():
     if AzureOpenAI is None or not key or not endpoint or not api_version:
         return None, None, None, None
     try:
-        client = AzureOpenAI(api_key=key, azure_endpoint=endpoint, api_version=api_version)
+        # Reuse the client (and its connection pool) while the settings are unchanged
+        with _lock:
+            client = _clients.get((key, endpoint, api_version))
+            if client is None:
+                client = AzureOpenAI(api_key=key, azure_endpoint=endpoint, api_version=api_version)
+                _clients[(key, endpoint, api_version)] = client
         return client, model, endpoint, api_version
     except Exception as e:
         global _last_error
@@ -79,15 +273,21 @@ def _client_from_env():
         return None, None, None, None
 
 
-def route_check(text: str) -> Optional[Dict[str, Any]]:
+def route_check(text: str, datasets: Optional[Dict[str, Optional[pd.DataFrame]]] = None) -> Optional[Dict[str, Any]]:
+    datasets = datasets or {}
+    # Paraphrases of an already routed check reuse its intent without an LLM call
+    hit = intent_cache().lookup(text)
+    if hit:
+        cached, score, matched = hit
+        cached = resolve_columns(cached, datasets)
+        if _fits_datasets(cached, datasets):
+            cached["cache_score"] = score
+            cached["cache_match"] = matched
+            return cached
     client, model, _, _ = _client_from_env()
     if client is None:
         return None
-    tools_desc = [{"name": t["name"], "args": t["args"], "description": t["description"]} for t in TOOLS]
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT + " Tools:" + json.dumps(tools_desc)},
-        {"role": "user", "content": text},
-    ]
+    messages = build_messages(text, describe_datasets(datasets))
     try:
         resp = client.chat.completions.create(model=model, messages=messages, temperature=0)
         content = resp.choices[0].message.content if resp.choices else None
@@ -102,6 +302,9 @@ def route_check(text: str) -> Optional[Dict[str, Any]]:
                 return None
             data = json.loads(m.group(0))
         if isinstance(data, dict) and "tool" in data and "args" in data:
+            data = resolve_columns(data, datasets)
+            if _fits_datasets(data, datasets):
+                intent_cache().add(text, data)
             return data
         return None
     except Exception as e:
@@ -12,6 +12,7 @@ from .tools import (
     regex_match,
     match_master_on_keys,
 )
+from .modes import RunMode, run_with_mode
 from .router import route_check
 
 TOOLS = {
@@ -26,10 +27,39 @@ TOOLS = {
 }
 
 
-def run_check(check_text: str, stock_df: pd.DataFrame, master_df: Optional[pd.DataFrame], gr_df: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
-    intent = route_check(check_text)
+def _invoke(tool_name: str, fn, args: Dict[str, Any], df: pd.DataFrame, master_df: Optional[pd.DataFrame]) -> ToolResult:
+    # `df` is the tool's target frame (stock, or GR for duplicates); modes may pass a chunk or sample of it
+    if tool_name == "value_in_master":
+        return fn(df, master_df, args["column"], args["master_column"])
+    if tool_name == "duplicates_check":
+        return fn(df, args["columns"], args.get("allowed", False))
+    if tool_name in ("column_exists", "date_not_future"):
+        return fn(df, args["column"])
+    if tool_name == "row_condition":
+        return fn(df, args["expr"])
+    if tool_name == "value_range":
+        return fn(df, args["column"], args.get("min_val"), args.get("max_val"), args.get("inclusive", True))
+    if tool_name == "regex_match":
+        return fn(df, args["column"], args["pattern"], args.get("mode", "all"))
+    if tool_name == "match_master_on_keys":
+        return fn(df, master_df, args["keys"], args["column"])
+    raise KeyError(tool_name)
+
+
+def run_check(
+    check_text: str,
+    stock_df: pd.DataFrame,
+    master_df: Optional[pd.DataFrame],
+    gr_df: Optional[pd.DataFrame] = None,
+    intent: Optional[Dict[str, Any]] = None,
+    mode: Optional[RunMode] = None,
+) -> Dict[str, Any]:
+    mode = mode or RunMode()
+    # Reuse an intent routed upstream (graph route node); otherwise route here
+    if intent is None:
+        intent = route_check(check_text, {"stock": stock_df, "master": master_df, "gr": gr_df})
     if not intent:
-        return {"check": check_text, "tool": None, "passed": False, "details": {"error": "Unable to route check"}}
+        return {"check": check_text, "tool": None, "passed": False, "details": {"error": "Unable to route check"}, "mode": mode.name}
     tool_name = intent["tool"]
     print("############## Running tool:", tool_name)
     args = intent.get("args", {})
@@ -37,34 +67,14 @@ def run_check(check_text: str, stock_df: pd.DataFrame, master_df: Optional[pd.Da
 
     fn = TOOLS.get(tool_name)
     if not fn:
-        return {"check": check_text, "tool": tool_name, "passed": False, "details": {"error": "Unknown tool"}}
+        return {"check": check_text, "tool": tool_name, "passed": False, "details": {"error": "Unknown tool"}, "mode": mode.name}
+    if tool_name in ("value_in_master", "match_master_on_keys") and master_df is None:
+        return {"check": check_text, "tool": tool_name, "passed": False, "details": {"error": "Master data required"}, "mode": mode.name}
 
+    target_df = gr_df if tool_name == "duplicates_check" and args.get("dataset") == "gr" and gr_df is not None else stock_df
     try:
-        if tool_name == "value_in_master":
-            if master_df is None:
-                return {"check": check_text, "tool": tool_name, "passed": False, "details": {"error": "Master data required"}}
-            res: ToolResult = fn(stock_df, master_df, args["column"], args["master_column"])  # type: ignore
-        elif tool_name == "duplicates_check":
-            dataset = args.get("dataset")
-            target_df = gr_df if dataset == "gr" and gr_df is not None else stock_df
-            res = fn(target_df, args["columns"], args.get("allowed", False))  # type: ignore
-        elif tool_name == "column_exists":
-            res = fn(stock_df, args["column"])  # type: ignore
-        elif tool_name == "row_condition":
-            res = fn(stock_df, args["expr"])  # type: ignore
-        elif tool_name == "date_not_future":
-            res = fn(stock_df, args["column"])  # type: ignore
-        elif tool_name == "value_range":
-            res = fn(stock_df, args["column"], args.get("min_val"), args.get("max_val"), args.get("inclusive", True))  # type: ignore
-        elif tool_name == "regex_match":
-            res = fn(stock_df, args["column"], args["pattern"], args.get("mode", "all"))  # type: ignore
-        elif tool_name == "match_master_on_keys":
-            if master_df is None:
-                return {"check": check_text, "tool": tool_name, "passed": False, "details": {"error": "Master data required"}}
-            res = fn(stock_df, master_df, args["keys"], args["column"])  # type: ignore
-        else:
-            return {"check": check_text, "tool": tool_name, "passed": False, "details": {"error": "Unhandled tool"}}
+        res, used = run_with_mode(tool_name, args, lambda part: _invoke(tool_name, fn, args, part, master_df), target_df, mode)
     except Exception as e:
-        return {"check": check_text, "tool": tool_name, "passed": False, "details": {"error": str(e), "args": args}}
+        return {"check": check_text, "tool": tool_name, "passed": False, "details": {"error": str(e), "args": args}, "cache_score": intent.get("cache_score"), "mode": mode.name}
 
-    return {"check": check_text, "tool": tool_name, "passed": res.passed, "details": res.info}
+    return {"check": check_text, "tool": tool_name, "passed": res.passed, "details": res.info, "cache_score": intent.get("cache_score"), "mode": used}
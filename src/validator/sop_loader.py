@@ -1,10 +1,35 @@
-from typing import Tuple
+import io
+from typing import Optional, Union
 import pandas as pd
 
+from .dtypes import compact_frame
+
 REQUIRED_SOP_COL = "checks"
 
+
+def load_frame(source: Union[str, bytes], name: Optional[str] = None, sheet_name: Optional[str] = None, compact: bool = True) -> pd.DataFrame:
+    """Read a csv/xlsx path (or raw bytes with `name` for the extension) into a DataFrame.
+
+    With `compact`, dtypes are inferred once here (see `dtypes.compact_frame`); the
+    memory report is kept in `df.attrs["compaction"]`.
+    """
+    name = (name or (source if isinstance(source, str) else "")).lower()
+    if name.endswith((".xlsx", ".xls")):
+        src = io.BytesIO(source) if isinstance(source, bytes) else source
+        df = pd.read_excel(src, sheet_name=sheet_name) if sheet_name else pd.read_excel(src)
+    else:
+        try:
+            df = pd.read_csv(io.BytesIO(source) if isinstance(source, bytes) else source)
+        except UnicodeDecodeError:
+            df = pd.read_csv(io.BytesIO(source) if isinstance(source, bytes) else source, encoding="latin1")
+    if compact:
+        df, _ = compact_frame(df)
+    return df
+
+
 def load_sop(path: str) -> pd.DataFrame:
-    df = pd.read_excel(path) if path.lower().endswith((".xlsx", ".xls")) else pd.read_csv(path)
+    # Check text is matched verbatim by the router, so the SOP is not compacted
+    df = load_frame(path, compact=False)
     if REQUIRED_SOP_COL not in df.columns:
         raise ValueError(f"SOP file must contain a column '{REQUIRED_SOP_COL}'")
     return df
@@ -5,6 +5,8 @@ from typing import Any, Dict, List, Optional, Tuple
 import pandas as pd
 from dateutil import parser
 
+from .dtypes import source_text
+
 @dataclass
 class ToolResult:
     passed: bool
@@ -217,9 +219,67 @@ from pandas import Series
 #
 
 def _as_numeric(df: pd.DataFrame, column: str) -> pd.Series:
+    # Columns compacted at load time are already numeric
+    if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column]):
+        return df[column]
     ser = df[column].astype(str).str.replace(',', '', regex=False).str.replace(' ', '', regex=False)
     return pd.to_numeric(ser, errors='coerce')
 
+
+def _as_dates(ser: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(ser):
+        return ser
+    return ser.apply(parse_date_safe)
+
+
+def _as_text(df: pd.DataFrame, column: str) -> pd.Series:
+    # Regexes are written against the file's text ("45,000"), not parsed values
+    raw = source_text(df, column)
+    return (raw.reindex(df.index) if raw is not None else df[column]).astype(str)
+
+
+def _examples(rows: pd.DataFrame, n: int = 5) -> List[Dict[str, Any]]:
+    """First n rows as records, with parsed columns shown as their original text."""
+    head = rows.head(n)
+    raw_cols = {c: source_text(rows, c) for c in head.columns if source_text(rows, c) is not None}
+    if raw_cols:
+        head = head.copy()
+        for col, raw in raw_cols.items():
+            head[col] = raw.reindex(head.index).astype(object)
+    return head.to_dict(orient="records")
+
+def _key_kind(ser: pd.Series) -> str:
+    if pd.api.types.is_datetime64_any_dtype(ser):
+        return "date"
+    if pd.api.types.is_numeric_dtype(ser) and not isinstance(ser.dtype, pd.CategoricalDtype):
+        return "num"
+    return "text"
+
+
+def _key_as_text(df: pd.DataFrame, column: str) -> pd.Series:
+    raw = source_text(df, column)
+    ser = raw.reindex(df.index) if raw is not None else df[column]
+    return ser.astype(str).where(ser.notna())
+
+
+def _aligned_keys(df: pd.DataFrame, master: pd.DataFrame, pairs: List[Tuple[str, str]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Give join/lookup keys the same dtype in both frames.
+
+    Frames are compacted independently, so a key may be numeric in one and text in
+    the other; such keys are compared on their original text.
+    """
+    left_cols: Dict[str, pd.Series] = {}
+    right_cols: Dict[str, pd.Series] = {}
+    for lcol, rcol in pairs:
+        if _key_kind(df[lcol]) != _key_kind(master[rcol]):
+            left_cols[lcol] = _key_as_text(df, lcol)
+            right_cols[rcol] = _key_as_text(master, rcol)
+    if left_cols:
+        df = df.assign(**left_cols)
+    if right_cols:
+        master = master.assign(**right_cols)
+    return df, master
+
 # ----------------------------------------
 
 def column_exists(df: pd.DataFrame, column: str) -> ToolResult:
@@ -231,7 +291,7 @@ def duplicates_check(df: pd.DataFrame, columns: List[str], allowed: bool = False
     dup = df.duplicated(subset=columns, keep=False)
     count = int(dup.sum())
     passed = allowed or count == 0
-    examples = df.loc[dup].head(5).to_dict(orient="records") if count else []
+    examples = _examples(df.loc[dup]) if count else []
     return ToolResult(passed=passed, info={"duplicate_count": count, "examples": examples})
 
 
@@ -241,9 +301,10 @@ def value_in_master(
     column: str,
     master_column: str,
 ) -> ToolResult:
-    missing = df[~df[column].isin(master[master_column])]
+    left, right = _aligned_keys(df, master, [(column, master_column)])
+    missing = df[~left[column].isin(right[master_column])]
     count = int(len(missing))
-    examples = missing.head(5).to_dict(orient="records") if count else []
+    examples = _examples(missing) if count else []
     return ToolResult(passed=count == 0, info={"missing_count": count, "examples": examples})
 
 
@@ -253,7 +314,7 @@ def row_condition(df: pd.DataFrame, expr: str) -> ToolResult:
         mask = df.eval(expr)
         failing = df[~mask]
         count = int(len(failing))
-        examples = failing.head(5).to_dict(orient="records") if count else []
+        examples = _examples(failing) if count else []
         return ToolResult(passed=count == 0, info={"failing_count": count, "examples": examples})
     except Exception as e:
         return ToolResult(passed=False, info={"error": str(e)})
@@ -261,12 +322,12 @@ def row_condition(df: pd.DataFrame, expr: str) -> ToolResult:
 
 def date_not_future(df: pd.DataFrame, column: str) -> ToolResult:
     now = pd.Timestamp.now().normalize()
-    parsed = df[column].apply(parse_date_safe)
+    parsed = _as_dates(df[column])
     future_mask = parsed > now
     future_mask = future_mask.fillna(False)
     failing = df[future_mask]
     count = int(len(failing))
-    examples = failing.head(5).to_dict(orient="records") if count else []
+    examples = _examples(failing) if count else []
     return ToolResult(passed=count == 0, info={"future_count": count, "examples": examples})
 
 
@@ -286,28 +347,31 @@ def value_range(df: pd.DataFrame, column: str, min_val: Optional[float] = None,
             mask &= ser < float(max_val)
     failing = df[~mask]
     count = int(len(failing))
-    examples = failing.head(5).to_dict(orient="records") if count else []
+    examples = _examples(failing) if count else []
     return ToolResult(passed=count == 0, info={"failing_count": count, "examples": examples})
 
 
 def regex_match(df: pd.DataFrame, column: str, pattern: str, mode: str = "all") -> ToolResult:
     # mode: all -> every row must match; any -> at least one matches
-    ser = df[column].astype(str)
+    ser = _as_text(df, column)
     matches = ser.str.match(pattern, na=False)
     if mode == "all":
         failing = df[~matches]
         count = int(len(failing))
-        examples = failing.head(5).to_dict(orient="records") if count else []
+        examples = _examples(failing) if count else []
         return ToolResult(passed=count == 0, info={"failing_count": count, "examples": examples})
     else:
         passed = bool(matches.any())
-        examples = df[matches].head(5).to_dict(orient="records") if passed else []
+        examples = _examples(df[matches]) if passed else []
         return ToolResult(passed=passed, info={"examples": examples})
 
 
 
 
 
+_STOCK_ROW = "__stock_row__"
+
+
 def match_master_on_keys(
     df: pd.DataFrame,
     master: pd.DataFrame,
@@ -315,15 +379,18 @@ def match_master_on_keys(
     column: str,
 ) -> ToolResult:
     # Join stock and master on keys; compare the given column for equality
-    left = df[keys + [column]].copy()
-    right = master[keys + [column]].copy()
+    left, right = _aligned_keys(df[keys + [column]], master[keys + [column]], [(k, k) for k in keys])
+    # Duplicate master keys fan a stock row out into several merged rows; remember which row each came from
+    left = left.assign(**{_STOCK_ROW: range(len(left))})
     merged = left.merge(right, on=keys, how="left", suffixes=("_stock", "_master"))
+    merged.attrs.pop("source_text", None)  # merge renumbers rows; source text no longer aligns
     stock_col = f"{column}_stock"
     master_col = f"{column}_master"
-    stock_parsed = merged[stock_col].apply(parse_date_safe)
-    master_parsed = merged[master_col].apply(parse_date_safe)
+    stock_parsed = _as_dates(merged[stock_col])
+    master_parsed = _as_dates(merged[master_col])
     mismatch = master_parsed.isna() | (stock_parsed != master_parsed)
     failing = merged[mismatch]
     count = int(len(failing))
-    examples = failing.head(5).to_dict(orient="records") if count else []
-    return ToolResult(passed=count == 0, info={"mismatch_count": count, "examples": examples})
+    rows = int(failing[_STOCK_ROW].nunique())
+    examples = _examples(failing.drop(columns=_STOCK_ROW)) if count else []
+    return ToolResult(passed=count == 0, info={"mismatch_count": count, "mismatch_rows": rows, "examples": examples})
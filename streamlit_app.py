@@ -1,11 +1,15 @@
 import io
 import os
+import time
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
 
 from src.graph.app import build_graph
+from src.validator.dtypes import memory_summary
+from src.validator.modes import MODES, RunMode
 from src.validator.router import has_llm
+from src.validator.sop_loader import load_frame
 
 st.set_page_config(page_title="SOP Validator", layout="wide")
 st.title("SOP Checklist Validator")
@@ -21,30 +25,57 @@ with st.sidebar:
     master_sheet = st.text_input("Master sheet name (xlsx)", value="Master")
     gr_file = st.file_uploader("GR file (optional, csv/xlsx)", type=["csv", "xlsx", "xls"])
     gr_sheet = st.text_input("GR sheet name (xlsx)", value="GR")
+    st.header("Run Mode")
+    mode_name = st.selectbox("Validation mode", MODES, help="full: exact counts; fail-fast: stop each check at N violations; sample: estimate violation rates on a stratified sample")
+    max_violations = st.number_input("Fail-fast: stop after N violations", min_value=1, value=1, step=1)
+    sample_size = st.number_input("Sample: rows per check", min_value=100, value=10_000, step=1_000)
     run_btn = st.button("Run Validation")
 
+# Run state survives widget-triggered reruns so finished checks are never recomputed
+state = st.session_state
+state.setdefault("run", None)  # loaded SOP + compiled graph of the current run
+state.setdefault("results", [])
+state.setdefault("running", False)
+state.setdefault("cancelled", False)
+state.setdefault("elapsed", 0.0)
+state.setdefault("excel", None)  # (result count, xlsx bytes)
+
+
+def _cancel():
+    state.running = False
+    state.cancelled = True
+
+
+def _resume():
+    state.running = True
+    state.cancelled = False
+
+
 # Helpers to read uploaded files to DataFrames
 
-def _read_df(upload, sheet_name=None):
+def _read_df(upload, sheet_name=None, compact=True):
     if upload is None:
         return None
     name = upload.name.lower()
-    data = upload.read()
-    bio = io.BytesIO(data)
-    if name.endswith(".csv"):
-        # Try utf-8 then fallback
-        try:
-            return pd.read_csv(io.BytesIO(data))
-        except Exception:
-            return pd.read_csv(io.BytesIO(data), encoding="latin1")
-    else:
-        return pd.read_excel(bio, sheet_name=sheet_name) if sheet_name else pd.read_excel(bio)
+    sheet = sheet_name if name.endswith((".xlsx", ".xls")) else None
+    return load_frame(upload.getvalue(), name=name, sheet_name=sheet, compact=compact)
+
+
+def _excel_bytes(results_df):
+    with io.BytesIO() as bio:
+        with pd.ExcelWriter(bio, engine="openpyxl") as xw:
+            results_df.to_excel(xw, index=False, sheet_name="results")
+        return bio.getvalue()
+
+
+def _fmt_secs(secs):
+    secs = int(round(secs))
+    return f"{secs // 60}m {secs % 60:02d}s" if secs >= 60 else f"{secs}s"
 
-results_df = None
 
 if run_btn:
     # Load SOP
-    sop_df = _read_df(sop_file)
+    sop_df = _read_df(sop_file, compact=False)
     if sop_df is None or "checks" not in sop_df.columns:
         st.error("SOP file must have a column named 'checks'.")
     else:
@@ -55,34 +86,69 @@ if run_btn:
         else:
             master_df = _read_df(master_file, sheet_name=master_sheet)
             gr_df = _read_df(gr_file, sheet_name=gr_sheet)
-            # Build graph and run each SOP check
-            wf = build_graph(stock_df, master_df, gr_df)
-            results = []
-            for _, row in sop_df.iterrows():
-                check_text = str(row["checks"]) 
-                out = wf.invoke({"check": check_text})
-                res = out.get("result", {})
-                # propagate id/severity if present
-                for extra in ("id", "severity"):
-                    if extra in sop_df.columns:
-                        res[extra] = row.get(extra)
-                results.append(res)
-
-            results_df = pd.DataFrame(results)
-            st.subheader("Results")
-            st.dataframe(results_df, use_container_width=True)
-
-            # Offer a downloadable Excel
-            with io.BytesIO() as bio:
-                with pd.ExcelWriter(bio, engine="openpyxl") as xw:
-                    results_df.to_excel(xw, index=False, sheet_name="results")
-                bio.seek(0)
-                st.download_button(
-                    label="Download results.xlsx",
-                    data=bio.read(),
-                    file_name="results.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                )
+            loaded = [f"{label} {memory_summary(df)}" for label, df in (("stock", stock_df), ("master", master_df), ("gr", gr_df)) if df is not None and memory_summary(df)]
+            # Build graph once per run; checks are streamed below
+            state.run = {"sop": sop_df, "graph": build_graph(stock_df, master_df, gr_df, mode=RunMode(mode_name, max_violations=int(max_violations), sample_size=int(sample_size))), "memory": loaded}
+            state.results = []
+            state.elapsed = 0.0
+            state.excel = None
+            state.running = True
+            state.cancelled = False
+
+run = state.run
+if run is not None:
+    sop_df = run["sop"]
+    total = len(sop_df)
+    if run["memory"]:
+        st.caption("Memory after dtype compaction: " + ", ".join(run["memory"]))
+    st.subheader("Results")
+    progress = st.progress(len(state.results) / total if total else 1.0)
+    status_line = st.empty()
+    table = st.empty()
+    if state.results:
+        table.dataframe(pd.DataFrame(state.results), use_container_width=True)
+
+    if state.running:
+        with st.sidebar:
+            st.button("Cancel run", on_click=_cancel)
+        wf = run["graph"]
+        # Resume from the first unfinished check (a rerun interrupts the loop mid-way)
+        for i in range(len(state.results), total):
+            row = sop_df.iloc[i]
+            status_line.caption(f"Running check {i + 1}/{total}: {row['checks']}")
+            started = time.perf_counter()
+            out = wf.invoke({"check": str(row["checks"])})
+            res = out.get("result", {})
+            # propagate id/severity if present
+            for extra in ("id", "severity"):
+                if extra in sop_df.columns:
+                    res[extra] = row.get(extra)
+            state.results.append(res)
+            state.elapsed += time.perf_counter() - started
+            done = len(state.results)
+            eta = state.elapsed / done * (total - done)
+            progress.progress(done / total, text=f"{done}/{total} checks, elapsed {_fmt_secs(state.elapsed)}, ETA {_fmt_secs(eta)}")
+            table.dataframe(pd.DataFrame(state.results), use_container_width=True)
+        state.running = False
+
+    done = len(state.results)
+    if state.cancelled and done < total:
+        status_line.warning(f"Run cancelled after {done}/{total} checks.")
+        with st.sidebar:
+            st.button("Resume run", on_click=_resume)
+    else:
+        status_line.caption(f"Completed {done}/{total} checks in {_fmt_secs(state.elapsed)}.")
+
+    if state.results:
+        # Export is built once per result set and kept across reruns
+        if state.excel is None or state.excel[0] != done:
+            state.excel = (done, _excel_bytes(pd.DataFrame(state.results)))
+        st.download_button(
+            label="Download results.xlsx",
+            data=state.excel[1],
+            file_name="results.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 
 status = "LLM routing: Active" if has_llm() else "LLM routing: Inactive (set .env: OPENAI_API_KEY/base_url/AZURE_API_VERSION/OPENAI_MODEL)"
 st.caption(status)
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from src.validator.dtypes import compact_frame
+from src.validator.tools import duplicates_check, match_master_on_keys, row_condition, value_in_master
+
+
+def test_leading_zero_after_sample_keeps_column_as_text():
+    values = [str(1000 + i) for i in range(300)] + ["0123", "123"]
+    df, _ = compact_frame(pd.DataFrame({"Qty": values}))
+    assert not pd.api.types.is_numeric_dtype(df["Qty"])
+    assert list(df["Qty"].tail(2)) == ["0123", "123"]
+
+
+def test_identifier_column_is_not_parsed_as_number():
+    values = [str(1000 + i) for i in range(300)] + ["0123", "123"]
+    df, _ = compact_frame(pd.DataFrame({"Batch": values}))
+    assert not pd.api.types.is_numeric_dtype(df["Batch"])
+    assert duplicates_check(df, ["Batch"]).info["duplicate_count"] == 0
+
+
+def test_numeric_quantities_still_compacted():
+    df, _ = compact_frame(pd.DataFrame({"Current Stock": ["1,200", "45,000", "750"]}))
+    assert pd.api.types.is_integer_dtype(df["Current Stock"])
+
+
+def test_keys_with_different_dtypes_across_frames():
+    stock, _ = compact_frame(pd.DataFrame({"Mat": ["1001", "1002", "1003"], "Date": ["10/15/2025"] * 3}))
+    master, _ = compact_frame(pd.DataFrame({"Mat": ["0001001", "1002", "1003"], "Date": ["10/15/2025"] * 3}))
+    assert pd.api.types.is_numeric_dtype(stock["Mat"]) and not pd.api.types.is_numeric_dtype(master["Mat"])
+
+    missing = value_in_master(stock, master, "Mat", "Mat")
+    assert missing.info["missing_count"] == 1
+
+    res = match_master_on_keys(stock, master, ["Mat"], "Date")
+    assert "error" not in res.info
+    assert res.info["mismatch_count"] == 1
+
+
+def test_parsed_integers_do_not_overflow_in_row_condition():
+    df, _ = compact_frame(pd.DataFrame({"Qty": ["100", "120", "90"], "Stock": ["45,000", "1,200", "750"]}))
+    assert list(df.eval("Qty * 2")) == [200, 240, 180]
+    assert df.eval("Stock * 100000").iloc[0] == 4_500_000_000
+    assert row_condition(df, "Qty * 2 > 190").info["failing_count"] == 1
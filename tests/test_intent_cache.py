@@ -0,0 +1,55 @@
+from src.validator.intent_cache import IntentCache
+
+DUP_GR = {"tool": "duplicates_check", "args": {"columns": ["Material Document"], "dataset": "gr", "allowed": False}}
+STOCK_POSITIVE = {"tool": "row_condition", "args": {"expr": "`Current Stock` > 0"}}
+CODE_IN_MASTER = {"tool": "value_in_master", "args": {"column": "Material Code", "master_column": "Material Code"}}
+
+
+def _cache():
+    cache = IntentCache()
+    cache.add("Ensure no duplicate receipt exists in MB51", DUP_GR)
+    cache.add("Current Stock must be greater than 0", STOCK_POSITIVE)
+    cache.add("Material Code must be in master", CODE_IN_MASTER)
+    return cache
+
+
+def test_mb51_paraphrase_reuses_intent():
+    hit = _cache().lookup("No duplicate GR in MB51")
+    assert hit is not None
+    intent, score, matched = hit
+    assert intent == DUP_GR
+    assert matched == "Ensure no duplicate receipt exists in MB51"
+    assert 0 < score <= 1
+
+
+def test_opposite_comparison_is_not_reused():
+    assert _cache().lookup("Current Stock must be less than 0") is None
+
+
+def test_negated_check_is_not_reused():
+    assert _cache().lookup("Material Code must not be empty") is None
+
+
+def test_comparison_synonym_still_matches():
+    hit = _cache().lookup("Current Stock should be above 0")
+    assert hit is not None and hit[0] == STOCK_POSITIVE
+
+
+def _same_column_cache():
+    cache = _cache()
+    cache.add("Material Code column exists", {"tool": "column_exists", "args": {"column": "Material Code"}})
+    cache.add("Batch must be unique", {"tool": "duplicates_check", "args": {"columns": ["Batch"], "allowed": False}})
+    return cache
+
+
+def test_unique_check_does_not_reuse_master_lookup():
+    assert _same_column_cache().lookup("Material Code must be unique") is None
+
+
+def test_master_check_does_not_reuse_column_exists():
+    hit = _same_column_cache().lookup("Material Code exists in master")
+    assert hit is None or hit[0] == CODE_IN_MASTER
+
+
+def test_gr_duplicates_do_not_reuse_stock_duplicates():
+    assert _same_column_cache().lookup("Batch must be unique in GR") is None
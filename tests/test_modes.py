@@ -0,0 +1,102 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.validator.modes import RunMode, run_with_mode
+from src.validator.tools import duplicates_check, match_master_on_keys, regex_match, row_condition
+
+
+def _dups(df, columns, mode):
+    args = {"columns": columns}
+    return run_with_mode("duplicates_check", args, lambda part: duplicates_check(part, columns), df, mode)
+
+
+def test_duplicates_fail_fast_matches_full_count():
+    df = pd.DataFrame({"Batch": [1, 2, 1, 3, 2, 4, 1]})
+    res, used = _dups(df, ["Batch"], RunMode("fail-fast", max_violations=100, chunk_size=2))
+    assert used == "fail-fast"
+    assert res.info["duplicate_count"] == duplicates_check(df, ["Batch"]).info["duplicate_count"] == 5
+    assert not res.info["stopped_early"]
+
+
+def test_duplicates_fail_fast_stops_at_nth_repeat():
+    df = pd.DataFrame({"Batch": [1, 2, 1, 3, 2, 4, 1]})
+    res, _ = _dups(df, ["Batch"], RunMode("fail-fast", max_violations=1))
+    # The first repeat is row 2, so only rows 0..2 are counted
+    assert res.info["rows_scanned"] == 3
+    assert res.info["stopped_early"]
+    assert res.info["duplicate_count"] == 2
+    assert not res.passed
+
+
+def test_duplicates_fail_fast_scales_linearly():
+    df = pd.DataFrame({"Batch": np.arange(1_000_000)})
+    start = time.perf_counter()
+    res, _ = _dups(df, ["Batch"], RunMode("fail-fast", max_violations=10, chunk_size=1_000))
+    assert time.perf_counter() - start < 5
+    assert res.info["duplicate_count"] == 0 and res.info["rows_scanned"] == len(df)
+
+
+def test_sampled_rate_counts_rows_not_merged_rows():
+    stock = pd.DataFrame({"Mat": np.arange(2_000), "Date": ["2025-01-01"] * 2_000})
+    # Every key appears three times in master with conflicting dates, so each stock row merges into three mismatches
+    master = pd.DataFrame({"Mat": np.repeat(np.arange(2_000), 3), "Date": ["2025-01-02", "2025-01-03", "2025-01-04"] * 2_000})
+    args = {"keys": ["Mat"], "column": "Date"}
+    call = lambda part: match_master_on_keys(part, master, ["Mat"], "Date")
+    res, used = run_with_mode("match_master_on_keys", args, call, stock, RunMode("sample", sample_size=500))
+    assert used == "sample"
+    assert res.info["mismatch_count"] == 3 * res.info["mismatch_rows"]
+    assert res.info["estimated_violation_rate"] == 1.0
+    assert 0 <= res.info["ci_low"] <= res.info["ci_high"] <= 1
+
+
+def _positive(df, mode):
+    expr = "`Current Stock` > 0"
+    return run_with_mode("row_condition", {"expr": expr}, lambda part: row_condition(part, expr), df, mode)
+
+
+def test_fail_fast_stops_after_max_violations():
+    df = pd.DataFrame({"Current Stock": [5, -1, 3, -2, 4, -3, 6, -4]})
+    res, used = _positive(df, RunMode("fail-fast", max_violations=2, chunk_size=2))
+    assert used == "fail-fast"
+    assert res.info["failing_count"] == 2
+    assert res.info["rows_scanned"] == 4 and res.info["rows_total"] == 8
+    assert res.info["stopped_early"]
+    assert not res.passed
+
+
+def test_fail_fast_scans_everything_when_under_the_limit():
+    df = pd.DataFrame({"Current Stock": [5, -1, 3, 4]})
+    res, _ = _positive(df, RunMode("fail-fast", max_violations=10, chunk_size=2))
+    assert res.info["failing_count"] == 1
+    assert not res.info["stopped_early"]
+
+
+def test_sample_rate_and_ci_include_blank_stratum():
+    n = 4_000
+    plant = pd.Series(["P1", "P2", None, "P3"] * (n // 4), dtype="category")
+    # Only rows without a Plant violate, so a 25% rate is only seen if the blank stratum is sampled
+    stock = np.where(plant.isna(), -1, 10)
+    df = pd.DataFrame({"Plant": plant, "Current Stock": stock})
+    res, used = _positive(df, RunMode("sample", sample_size=400, strata="Plant"))
+    assert used == "sample"
+    assert res.info["strata"] == "Plant"
+    assert res.info["sample_size"] == 400
+    assert res.info["estimated_violation_rate"] == 0.25
+    assert res.info["ci_low"] < 0.25 < res.info["ci_high"]
+    assert 0 <= res.info["ci_low"] and res.info["ci_high"] <= 1
+
+
+def test_sample_falls_back_to_full_for_whole_dataset_tools():
+    df = pd.DataFrame({"Batch": [f"B{i}" for i in range(500)] + ["B0"], "Code": ["X"] * 500 + ["ok-1"]})
+    mode = RunMode("sample", sample_size=50)
+
+    res, used = _dups(df, ["Batch"], mode)
+    assert used == "full"
+    assert res.info["duplicate_count"] == 2
+
+    args = {"column": "Code", "pattern": r"ok-\d", "mode": "any"}
+    res, used = run_with_mode("regex_match", args, lambda part: regex_match(part, **args), df, mode)
+    assert used == "full"
+    assert res.passed
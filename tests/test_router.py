@@ -0,0 +1,40 @@
+import pandas as pd
+
+from src.validator import router
+from src.validator.intent_cache import IntentCache
+
+DUP_GR = {"tool": "duplicates_check", "args": {"columns": ["Batch"], "dataset": "gr", "allowed": False}}
+
+
+def _route(monkeypatch, datasets):
+    cache = IntentCache()
+    cache.add("Batch must be unique in GR", DUP_GR)
+    monkeypatch.setattr(router, "_intent_cache", cache)
+    monkeypatch.setattr(router, "_client_from_env", lambda: (None, None, None, None))
+    return router.route_check("Batch should be unique in GR", datasets)
+
+
+def test_cached_gr_intent_needs_gr_frame(monkeypatch):
+    stock = pd.DataFrame({"Batch": ["B1", "B2"]})
+    assert _route(monkeypatch, {"stock": stock, "master": None, "gr": None}) is None
+
+
+def test_cached_gr_intent_needs_its_columns_in_gr(monkeypatch):
+    stock = pd.DataFrame({"Batch": ["B1", "B2"]})
+    gr = pd.DataFrame({"Material Document": ["D1", "D2"]})
+    assert _route(monkeypatch, {"stock": stock, "master": None, "gr": gr}) is None
+
+
+def test_cached_gr_intent_reused_when_gr_loaded(monkeypatch):
+    gr = pd.DataFrame({"Batch": ["B1", "B2"]})
+    intent = _route(monkeypatch, {"stock": pd.DataFrame({"Qty": [1]}), "master": None, "gr": gr})
+    assert intent["tool"] == "duplicates_check" and intent["args"]["dataset"] == "gr"
+    assert intent["cache_score"] >= router.DEFAULT_THRESHOLD
+
+
+def test_schema_memo_follows_frame_contents():
+    first = router.describe_datasets({"stock": pd.DataFrame({"Plant": ["P1", "P2"]})})
+    # Same name, shape and columns (and possibly the same id after reload) but new values
+    second = router.describe_datasets({"stock": pd.DataFrame({"Plant": ["P7", "P8"]})})
+    assert "P1|P2" in first and "P7|P8" in second
+    assert router.describe_datasets({"stock": pd.DataFrame({"Plant": ["P7", "P8"]})}) is second
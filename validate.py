@@ -1,6 +1,8 @@
 import argparse
 import pandas as pd
-from src.validator.sop_loader import load_sop
+from src.validator.dtypes import memory_summary
+from src.validator.modes import MODES, RunMode
+from src.validator.sop_loader import load_frame, load_sop
 from src.validator.runner import run_check
 
 
@@ -12,35 +14,41 @@ def main():
     ap.add_argument("--sheet", help="Sheet name for stock file (optional)")
     ap.add_argument("--meta-sheet", help="Sheet name for master file (optional)")
     ap.add_argument("--out", default="results.xlsx", help="Output results file (xlsx/csv)")
+    ap.add_argument("--mode", choices=MODES, default="full", help="full: exact counts; fail-fast: stop at --max-violations; sample: estimate on a stratified sample")
+    ap.add_argument("--max-violations", type=int, default=1, help="Violations after which a fail-fast check stops")
+    ap.add_argument("--chunk-size", type=int, default=100_000, help="Rows per chunk in fail-fast mode")
+    ap.add_argument("--sample-size", type=int, default=10_000, help="Rows sampled per check in sample mode")
+    ap.add_argument("--strata", help="Column to stratify the sample on (default: first low-cardinality categorical)")
 
     args = ap.parse_args()
 
     sop_df = load_sop(args.sop)
+    mode = RunMode(args.mode, max_violations=args.max_violations, chunk_size=args.chunk_size, sample_size=args.sample_size, strata=args.strata)
 
-    # Load stock
-    if args.input.lower().endswith((".xlsx", ".xls")):
-        stock_df = pd.read_excel(args.input, sheet_name=args.sheet) if args.sheet else pd.read_excel(args.input)
-    else:
-        stock_df = pd.read_csv(args.input)
+    # Load stock (dtypes compacted once at load time)
+    stock_df = load_frame(args.input, sheet_name=args.sheet)
 
     # Load master (optional)
     master_df = None
     if args.meta:
-        if args.meta.lower().endswith((".xlsx", ".xls")):
-            master_df = pd.read_excel(args.meta, sheet_name=args.meta_sheet) if args.meta_sheet else pd.read_excel(args.meta)
-        else:
-            master_df = pd.read_csv(args.meta)
+        master_df = load_frame(args.meta, sheet_name=args.meta_sheet)
+
+    for label, df in (("stock", stock_df), ("master", master_df)):
+        if df is not None and memory_summary(df):
+            print(f"Loaded {label}: {len(df)} rows, memory {memory_summary(df)}")
 
     results = []
     for _, row in sop_df.iterrows():
         check_text = str(row["checks"])  # required column
-        res = run_check(check_text, stock_df, master_df)
+        res = run_check(check_text, stock_df, master_df, mode=mode)
         # propagate optional metadata like id/severity
         out = {
             "check": res["check"],
             "tool": res["tool"],
             "passed": res["passed"],
             "details": res["details"],
+            "cache_score": res.get("cache_score"),
+            "mode": res.get("mode"),
         }
         for extra in ("id", "severity"):
             if extra in sop_df.columns: